@@ -1,26 +1,1539 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import pandas as pd
+import numpy as np
+import openpyxl
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+from pandas.io.parsers import TextParser
 import os
 import re
+import glob
+import sys
 import json
+import argparse
+import queue
+import time
+import heapq
+import pickle
+import shutil
+import sqlite3
+import tempfile
+import hashlib
+import threading
 from datetime import datetime
-from tkcalendar import DateEntry
+try:
+    from tkcalendar import DateEntry
+except ImportError:
+    # Only the GUI needs the date picker; headless runs work without it
+    DateEntry = None
 
-class ExcelConverterWithConfig:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("Excel to CSV Converter with Config")
-        self.root.geometry("700x600")
+class CSVOutputWriter:
+    """Stream processed chunks to a CSV file, optionally split into numbered parts"""
+    
+    def __init__(self, output_path, max_rows=None, max_bytes=None, block_rows=1000):
+        self.output_path = output_path
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.block_rows = block_rows
+        self.sharded = bool(max_rows or max_bytes)
+        self.header = None
+        self.file = None
+        self.part = None
+        self.checksum = None
+        self.parts = []
+        self.paths = []
+    
+    def get_part_path(self, number):
+        """Build the path of a numbered part, e.g. sales_report_20261017_part0003.csv"""
+        base, ext = os.path.splitext(self.output_path)
+        return f"{base}_part{number:04d}{ext}"
+    
+    def get_manifest_path(self):
+        """Build the path of the manifest listing all parts"""
+        return os.path.splitext(self.output_path)[0] + '_manifest.json'
+    
+    def remove_stale_parts(self):
+        """Delete parts left by an earlier run so loaders only see this run's output"""
+        base, ext = os.path.splitext(self.output_path)
+        for path in glob.glob(f"{glob.escape(base)}_part[0-9][0-9][0-9][0-9]{ext}"):
+            os.remove(path)
+    
+    def open_part(self):
+        if self.sharded:
+            if not self.parts:
+                self.remove_stale_parts()
+            path = self.get_part_path(len(self.parts) + 1)
+        else:
+            path = self.output_path
+        
+        self.file = open(path, 'wb')
+        self.paths.append(path)
+        self.part = {'file': os.path.basename(path), 'rows': 0, 'bytes': 0}
+        self.checksum = hashlib.sha256()
+        self.write_bytes(self.header)
+    
+    def close_part(self):
+        self.file.close()
+        self.file = None
+        self.part['sha256'] = self.checksum.hexdigest()
+        self.parts.append(self.part)
+    
+    def write_bytes(self, data):
+        self.file.write(data)
+        self.checksum.update(data)
+        self.part['bytes'] += len(data)
+    
+    def write(self, df):
+        """Append a processed chunk, starting a new part whenever a limit is reached"""
+        if self.header is None:
+            self.header = df.iloc[:0].to_csv(index=False).encode('utf-8')
+        
+        start = 0
+        while start < len(df):
+            if self.file is None:
+                self.open_part()
+            
+            # Unsharded output is written a whole chunk at a time; sharded
+            # output in small blocks so parts end close to the byte limit
+            stop = len(df)
+            if self.sharded:
+                stop = min(stop, start + self.block_rows)
+            if self.max_rows:
+                stop = min(stop, start + self.max_rows - self.part['rows'])
+            
+            data = df.iloc[start:stop].to_csv(index=False, header=False).encode('utf-8')
+            if self.max_bytes:
+                # Halve the block until it fits in what is left of the part
+                while (self.part['bytes'] + len(data) > self.max_bytes
+                       and stop - start > 1):
+                    stop = start + (stop - start) // 2
+                    data = df.iloc[start:stop].to_csv(index=False, header=False).encode('utf-8')
+                if self.part['rows'] > 0 and self.part['bytes'] + len(data) > self.max_bytes:
+                    self.close_part()
+                    continue
+            
+            self.write_bytes(data)
+            self.part['rows'] += stop - start
+            start = stop
+            
+            if self.max_rows and self.part['rows'] >= self.max_rows:
+                self.close_part()
+    
+    def close(self):
+        """Finish the last part and write the manifest for sharded output"""
+        if self.file is None and not self.parts and self.header is not None:
+            # Input without data rows still produces a header-only file
+            self.open_part()
+        if self.file is not None:
+            self.close_part()
+        
+        if self.sharded:
+            manifest = {
+                'output': os.path.basename(self.output_path),
+                'total_rows': sum(part['rows'] for part in self.parts),
+                'parts': self.parts
+            }
+            manifest_path = self.get_manifest_path()
+            with open(manifest_path, 'w') as f:
+                json.dump(manifest, f, indent=4)
+            self.paths.append(manifest_path)
+    
+    def commit(self):
+        # CSV output is complete once closed
+        pass
+    
+    def abort(self):
+        """Close and remove everything written so far"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        for path in self.paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+def quote_identifier(name):
+    """Quote a table or column name for use in SQL"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+class SQLiteDatabase:
+    """One connection and transaction shared by every output of a file in a database"""
+    
+    def __init__(self, database_path):
+        self.database_path = database_path
+        self.connection = sqlite3.connect(database_path, isolation_level=None)
+        # Bulk-load settings: WAL keeps readers unblocked, NORMAL sync is
+        # still crash-safe in WAL mode, and a larger cache cuts page spills
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("PRAGMA cache_size=-65536")
+        self.connection.execute("PRAGMA temp_store=MEMORY")
+        self.connection.execute("BEGIN")
+    
+    def commit(self):
+        """Commit the file's rows; later calls by other outputs do nothing"""
+        if self.connection is None:
+            return
+        try:
+            self.connection.execute("COMMIT")
+        except Exception:
+            self.rollback()
+            raise
+        self.connection.close()
+        self.connection = None
+    
+    def rollback(self):
+        """Roll back everything inserted for this file, unless already committed"""
+        if self.connection is None:
+            return
+        if self.connection.in_transaction:
+            self.connection.execute("ROLLBACK")
+        self.connection.close()
+        self.connection = None
+
+class SQLiteOutputWriter:
+    """Stream processed chunks into a SQLite table inside the file's transaction"""
+    
+    def __init__(self, database, table, indexes=None):
+        self.database = database
+        self.connection = database.connection
+        self.table = table
+        self.indexes = indexes or []
+        self.columns = None
+        self.insert_sql = None
+    
+    def prepare_table(self, columns):
+        """Create the table, or add any columns an existing table is missing"""
+        self.columns = [str(column) for column in columns]
+        table = quote_identifier(self.table)
+        column_defs = ", ".join(f"{quote_identifier(column)} TEXT" for column in self.columns)
+        self.connection.execute(f"CREATE TABLE IF NOT EXISTS {table} ({column_defs})")
+        
+        existing = {row[1] for row in self.connection.execute(f"PRAGMA table_info({table})")}
+        for column in self.columns:
+            if column not in existing:
+                self.connection.execute(f"ALTER TABLE {table} ADD COLUMN {quote_identifier(column)} TEXT")
+        
+        # SQLite treats an unknown double-quoted name as a string literal, so
+        # a misspelled column would silently index a constant
+        known = existing | set(self.columns)
+        for index_columns in self.get_index_columns():
+            missing = [column for column in index_columns if column not in known]
+            if missing:
+                raise ValueError(
+                    f"Index column(s) not found in table {self.table}: {', '.join(missing)}"
+                )
+        
+        column_list = ", ".join(quote_identifier(column) for column in self.columns)
+        placeholders = ", ".join("?" for _ in self.columns)
+        self.insert_sql = f"INSERT INTO {table} ({column_list}) VALUES ({placeholders})"
+    
+    def get_index_columns(self):
+        return [[index_columns] if isinstance(index_columns, str) else list(index_columns)
+                for index_columns in self.indexes]
+    
+    def write(self, df):
+        """Insert a processed chunk with a single executemany call"""
+        if self.columns is None:
+            self.prepare_table(df.columns)
+        
+        values = df.astype(object).where(df.notna(), None)
+        self.connection.executemany(self.insert_sql, values.itertuples(index=False, name=None))
+    
+    def close(self):
+        """Build the configured indexes; the rows are committed by commit()"""
+        if self.columns is not None:
+            for index_columns in self.get_index_columns():
+                name = quote_identifier(f"idx_{self.table}_{'_'.join(index_columns)}")
+                column_list = ", ".join(quote_identifier(column) for column in index_columns)
+                self.connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS {name} ON {quote_identifier(self.table)} ({column_list})"
+                )
+    
+    def commit(self):
+        self.database.commit()
+    
+    def abort(self):
+        self.database.rollback()
+
+class ColumnStatistics:
+    """Per-column profile of an output, accumulated chunk by chunk"""
+    
+    # 2**12 HyperLogLog registers per column: 4 KB each, ~1.6% standard error
+    precision = 12
+    
+    def __init__(self):
+        self.row_count = 0
+        self.columns = {}
+    
+    def new_column(self):
+        return {
+            'null_count': 0,
+            'min': None,
+            'max': None,
+            'numeric': True,
+            'numeric_min': None,
+            'numeric_max': None,
+            'max_length': 0,
+            'registers': np.zeros(2 ** self.precision, dtype=np.uint8)
+        }
+    
+    def update(self, df):
+        """Fold a processed chunk into the running statistics"""
+        self.row_count += len(df)
+        for column in df.columns:
+            stats = self.columns.setdefault(str(column), self.new_column())
+            series = df[column]
+            values = series.dropna()
+            stats['null_count'] += len(series) - len(values)
+            if len(values) == 0:
+                continue
+            
+            strings = values.astype(str)
+            stats['max_length'] = max(stats['max_length'], int(strings.str.len().max()))
+            
+            # Track string order (which suits ISO dates) and, while every
+            # value parses as a number, numeric order as well
+            self.update_range(stats, 'min', 'max', strings)
+            if stats['numeric']:
+                numbers = pd.to_numeric(strings, errors='coerce')
+                if numbers.notna().all():
+                    self.update_range(stats, 'numeric_min', 'numeric_max', numbers)
+                else:
+                    stats['numeric'] = False
+            
+            self.add_to_sketch(stats['registers'], strings)
+    
+    def update_range(self, stats, min_key, max_key, values):
+        chunk_min, chunk_max = values.min(), values.max()
+        stats[min_key] = chunk_min if stats[min_key] is None else min(stats[min_key], chunk_min)
+        stats[max_key] = chunk_max if stats[max_key] is None else max(stats[max_key], chunk_max)
+    
+    def add_to_sketch(self, registers, strings):
+        """Add values to a column's HyperLogLog registers"""
+        hashes = pd.util.hash_pandas_object(strings, index=False).to_numpy()
+        bits = 64 - self.precision
+        buckets = (hashes >> np.uint64(bits)).astype(np.intp)
+        remainder = (hashes & np.uint64((1 << bits) - 1)).astype(np.float64)
+        # frexp gives the exact bit length of the remainder, so the rank is
+        # the position of its leftmost 1-bit
+        _, bit_length = np.frexp(remainder)
+        ranks = (bits + 1 - bit_length).astype(np.uint8)
+        np.maximum.at(registers, buckets, ranks)
+    
+    def estimate_distinct(self, registers):
+        """Estimate the number of distinct values from HyperLogLog registers"""
+        m = len(registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.power(2.0, -registers.astype(np.float64)))
+        zeros = np.count_nonzero(registers == 0)
+        if estimate <= 2.5 * m and zeros > 0:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+    
+    def to_dict(self):
+        columns = {}
+        for name, stats in self.columns.items():
+            minimum, maximum = stats['min'], stats['max']
+            if stats['numeric'] and stats['numeric_min'] is not None:
+                minimum, maximum = stats['numeric_min'], stats['numeric_max']
+                if isinstance(minimum, np.generic):
+                    minimum, maximum = minimum.item(), maximum.item()
+            columns[name] = {
+                'null_count': stats['null_count'],
+                'min': minimum,
+                'max': maximum,
+                'approx_distinct': self.estimate_distinct(stats['registers']),
+                'max_length': stats['max_length']
+            }
+        return {'row_count': self.row_count, 'columns': columns}
+    
+    def save(self, path, output_path):
+        """Write the statistics as a JSON sidecar"""
+        with open(path, 'w') as f:
+            json.dump(dict(output=os.path.basename(output_path), **self.to_dict()), f, indent=4)
+
+class ExternalSortWriter:
+    """Sort (and optionally partition) chunks that may not fit in memory together"""
+    
+    # Most run files merged at once; more runs are merged in several passes
+    merge_fan_in = 64
+    
+    def __init__(self, get_output_path, open_writer, sort_by=None, partition_by=None,
+                 run_rows=50000, block_rows=10000, temp_dir=None, listing_path=None,
+                 remove_output=None):
+        # get_output_path(partition_value) names the output of one partition
+        # (the value is None when the output is not partitioned) and
+        # open_writer(output_path) creates its writer. listing_path records
+        # the partition outputs so that remove_output(output_path) can delete
+        # those of an earlier run that this run does not write again
+        self.get_output_path = get_output_path
+        self.open_writer = open_writer
+        self.listing_path = listing_path
+        self.remove_output = remove_output
+        self.partition_by = partition_by
+        self.key_columns = ([partition_by] if partition_by else []) + list(sort_by or [])
+        self.run_rows = run_rows
+        self.block_rows = block_rows
+        self.temp_root = temp_dir
+        self.temp_dir = None
+        self.columns = None
+        self.key_indexes = None
+        self.buffer = []
+        self.buffered_rows = 0
+        self.runs = []
+        self.run_count = 0
+        self.writers = []
+        self.issued = {}
+        self.output_paths = []
+    
+    @staticmethod
+    def value_key(value):
+        """Order numbers numerically, then other values as strings, then nulls"""
+        if pd.isna(value):
+            return (2, 0.0, '')
+        try:
+            number = float(value)
+            if number == number:
+                # Equal numbers written differently, like '7' and '7.0', are
+                # distinct partition values, so ties are broken by the text
+                return (0, number, str(value))
+        except (TypeError, ValueError):
+            pass
+        return (1, 0.0, str(value))
+    
+    def sort_key(self, row):
+        return tuple(self.value_key(row[index]) for index in self.key_indexes)
+    
+    def write(self, df):
+        """Buffer a chunk, spilling a sorted run once enough rows are buffered"""
+        if self.columns is None:
+            self.columns = list(df.columns)
+            missing = [column for column in self.key_columns if column not in self.columns]
+            if missing:
+                raise ValueError(f"Sort/partition column(s) not found: {', '.join(map(str, missing))}")
+            self.key_indexes = [self.columns.index(column) for column in self.key_columns]
         
+        if len(df):
+            self.buffer.append(df)
+            self.buffered_rows += len(df)
+        if self.buffered_rows >= self.run_rows:
+            self.write_run(self.sorted_buffer())
+    
+    def sorted_buffer(self):
+        rows = [row for df in self.buffer for row in df.itertuples(index=False, name=None)]
+        rows.sort(key=self.sort_key)
+        self.buffer = []
+        self.buffered_rows = 0
+        return rows
+    
+    def write_run(self, rows):
+        """Store sorted rows in a temporary run file, in pickled blocks"""
+        if self.temp_dir is None:
+            self.temp_dir = tempfile.mkdtemp(prefix='sort_', dir=self.temp_root)
+        self.run_count += 1
+        path = os.path.join(self.temp_dir, f"run{self.run_count:06d}.pkl")
+        with open(path, 'wb') as f:
+            block = []
+            for row in rows:
+                block.append(row)
+                if len(block) >= self.block_rows:
+                    pickle.dump(block, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    block = []
+            if block:
+                pickle.dump(block, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.runs.append(path)
+    
+    def read_run(self, path):
+        with open(path, 'rb') as f:
+            while True:
+                try:
+                    block = pickle.load(f)
+                except EOFError:
+                    return
+                yield from block
+    
+    def merged_rows(self):
+        """K-way merge of all runs, in several passes when there are many"""
+        while len(self.runs) > self.merge_fan_in:
+            group = self.runs[:self.merge_fan_in]
+            self.runs = self.runs[self.merge_fan_in:]
+            self.write_run(heapq.merge(*(self.read_run(path) for path in group), key=self.sort_key))
+            for path in group:
+                os.remove(path)
+        return heapq.merge(*(self.read_run(path) for path in self.runs), key=self.sort_key)
+    
+    def start_writer(self, partition_value):
+        """Open the output of the next partition, refusing names already written"""
+        output_path = self.get_output_path(partition_value)
+        key = os.path.normcase(os.path.abspath(output_path))
+        if key in self.issued:
+            raise ValueError(
+                f"Partition values {self.issued[key]!r} and {partition_value!r} "
+                f"both map to output {os.path.basename(output_path)}"
+            )
+        self.issued[key] = partition_value
+        self.output_paths.append(output_path)
+        
+        writer = self.open_writer(output_path)
+        self.writers.append(writer)
+        return writer
+    
+    def remove_listed_outputs(self):
+        """Delete the outputs the listing of an earlier run recorded"""
+        if self.listing_path is None or not os.path.exists(self.listing_path):
+            return
+        with open(self.listing_path, 'r') as f:
+            listing = json.load(f)
+        directory = os.path.dirname(self.listing_path)
+        for name in listing['outputs']:
+            self.remove_output(os.path.join(directory, name))
+        os.remove(self.listing_path)
+    
+    def write_listing(self):
+        if self.listing_path is None:
+            return
+        listing = {'outputs': [os.path.basename(path) for path in self.output_paths]}
+        with open(self.listing_path, 'w') as f:
+            json.dump(listing, f, indent=4)
+    
+    def emit(self, rows):
+        """Write sorted rows, switching to a new output whenever the partition changes"""
+        writer = None
+        current_key = None
+        block = []
+        for row in rows:
+            if self.partition_by:
+                partition_key = self.value_key(row[self.key_indexes[0]])
+                if writer is None or partition_key != current_key:
+                    if writer is not None:
+                        writer.write(pd.DataFrame(block, columns=self.columns))
+                        writer.close()
+                        block = []
+                    writer = self.start_writer(row[self.key_indexes[0]])
+                    current_key = partition_key
+            elif writer is None:
+                writer = self.start_writer(None)
+            
+            block.append(row)
+            if len(block) >= self.block_rows:
+                writer.write(pd.DataFrame(block, columns=self.columns))
+                block = []
+        
+        if writer is None and not self.partition_by:
+            # Input without data rows still produces a header-only output
+            writer = self.start_writer(None)
+        if writer is not None:
+            writer.write(pd.DataFrame(block, columns=self.columns or []))
+            writer.close()
+    
+    def close(self):
+        """Sort everything written and pass it on to the output writer(s)"""
+        try:
+            # Partitions of an earlier run may not reappear in this one
+            self.remove_listed_outputs()
+            if not self.runs:
+                # Everything fitted in one run, so skip the temporary files
+                self.emit(self.sorted_buffer())
+            else:
+                if self.buffer:
+                    self.write_run(self.sorted_buffer())
+                self.emit(self.merged_rows())
+            self.write_listing()
+        except Exception:
+            self.abort()
+            raise
+        self.remove_temp_dir()
+    
+    def commit(self):
+        for writer in self.writers:
+            writer.commit()
+    
+    def abort(self):
+        """Discard the runs and every output written so far"""
+        for writer in self.writers:
+            writer.abort()
+        self.writers = []
+        self.remove_temp_dir()
+    
+    def remove_temp_dir(self):
+        if self.temp_dir is not None:
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+            self.temp_dir = None
+
+def hash_rows(df, columns=None):
+    """Hash each row (or its key columns) to a uint64, independent of chunk dtypes"""
+    if columns:
+        df = df[columns]
+    values = df.astype(object).where(df.notna(), None)
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+class RowHashIndex:
+    """Sorted uint64 hashes of the rows (or keys) written by earlier runs
+    
+    Besides the current state the index keeps the state from before the date
+    it was last updated for, so re-running that date computes the same delta
+    instead of an empty one.
+    """
+    
+    def __init__(self, path, run_date, keyed=False):
+        self.path = path
+        self.run_date = run_date
+        self.keyed = keyed
+        empty = np.empty(0, dtype=np.uint64)
+        # State the delta is computed against, and the latest state
+        self.keys, self.hashes = empty, empty if keyed else None
+        self.current_keys, self.current_hashes = self.keys, self.hashes
+        self.pending_keys = []
+        self.pending_hashes = []
+        
+        if os.path.exists(path):
+            with np.load(path) as data:
+                self.current_keys = data['keys']
+                self.current_hashes = data['hashes'] if keyed else None
+                last_date = str(data['run_date']) if 'run_date' in data else None
+                if last_date is not None and run_date < last_date:
+                    raise ValueError(
+                        f"Delta index {os.path.basename(path)} was last updated for {last_date}; "
+                        f"cannot compute a delta for the earlier date {run_date}"
+                    )
+                if last_date == run_date:
+                    self.keys = data['previous_keys']
+                    self.hashes = data['previous_hashes'] if keyed else None
+                else:
+                    self.keys, self.hashes = self.current_keys, self.current_hashes
+    
+    def filter(self, keys, hashes=None):
+        """Return a mask of rows that are new or changed since the previous date"""
+        self.pending_keys.append(keys)
+        if self.keyed:
+            self.pending_hashes.append(hashes)
+        
+        if len(self.keys) == 0:
+            return np.ones(len(keys), dtype=bool)
+        
+        positions = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        mask = self.keys[positions] != keys
+        if self.keyed:
+            mask |= self.hashes[positions] != hashes
+        return mask
+    
+    def save(self):
+        """Merge this run's rows into the index and write it to disk"""
+        keys = np.concatenate([self.current_keys] + self.pending_keys)
+        # np.unique keeps the first occurrence, so search the reversed array
+        # to let the latest value of a key win
+        keys, first = np.unique(keys[::-1], return_index=True)
+        arrays = {
+            'keys': keys,
+            'previous_keys': self.keys,
+            'run_date': np.array(self.run_date)
+        }
+        if self.keyed:
+            hashes = np.concatenate([self.current_hashes] + self.pending_hashes)
+            arrays['hashes'] = hashes[::-1][first]
+            arrays['previous_hashes'] = self.hashes
+        
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(temp_path, self.path)
+        
+        self.current_keys = keys
+        self.current_hashes = arrays.get('hashes')
+        self.pending_keys = []
+        self.pending_hashes = []
+
+class SpillingHashSet:
+    """Set of uint64 row hashes that spills sorted runs to disk past a memory budget"""
+    
+    # Lookups search every run, so merge runs once there are more than this
+    max_runs = 8
+    
+    def __init__(self, memory_bytes, spill_dir=None, merge_block=1 << 20):
+        self.max_items = max(memory_bytes // 8, 1)
+        self.spill_dir = spill_dir
+        self.merge_block = merge_block
+        self.temp_dir = None
+        self.run_count = 0
+        # Hashes of files already written, hashes of the file being written,
+        # and [array, path, committed] for every run on disk
+        self.memory = np.empty(0, dtype=np.uint64)
+        self.staged = np.empty(0, dtype=np.uint64)
+        self.runs = []
+    
+    @staticmethod
+    def search(array, values):
+        if len(array) == 0:
+            return np.zeros(len(values), dtype=bool)
+        positions = np.minimum(np.searchsorted(array, values), len(array) - 1)
+        return array[positions] == values
+    
+    def contains(self, values):
+        found = self.search(self.memory, values) | self.search(self.staged, values)
+        for array, _, _ in self.runs:
+            found |= self.search(array, values)
+        return found
+    
+    def add_new(self, hashes):
+        """Add hashes and return a mask of the ones that were not seen before"""
+        unique, first = np.unique(hashes, return_index=True)
+        new = ~self.contains(unique)
+        self.staged = self.merge_sorted(self.staged, unique[new])
+        if len(self.memory) + len(self.staged) > self.max_items:
+            self.spill()
+        
+        mask = np.zeros(len(hashes), dtype=bool)
+        mask[first[new]] = True
+        return mask
+    
+    @staticmethod
+    def merge_sorted(array, values):
+        return np.insert(array, np.searchsorted(array, values), values)
+    
+    def new_run_path(self):
+        if self.temp_dir is None:
+            self.temp_dir = tempfile.mkdtemp(prefix='dedup_', dir=self.spill_dir)
+        self.run_count += 1
+        return os.path.join(self.temp_dir, f"run{self.run_count:06d}.npy")
+    
+    def spill(self):
+        """Move the in-memory hashes to sorted, memory-mapped run files"""
+        for array, committed in ((self.memory, True), (self.staged, False)):
+            if len(array):
+                path = self.new_run_path()
+                np.save(path, array)
+                self.runs.append([np.load(path, mmap_mode='r'), path, committed])
+        self.memory = np.empty(0, dtype=np.uint64)
+        self.staged = np.empty(0, dtype=np.uint64)
+    
+    def merge_runs(self, first, second):
+        """Merge two sorted runs block by block into a new run file"""
+        path = self.new_run_path()
+        merged = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint64,
+                                           shape=(len(first[0]) + len(second[0]),))
+        a, b = first[0], second[0]
+        i = j = k = 0
+        while i < len(a) or j < len(b):
+            block_a = a[i:i + self.merge_block]
+            block_b = b[j:j + self.merge_block]
+            if len(block_a) and len(block_b):
+                # Everything up to the smaller block maximum can be emitted now
+                limit = min(block_a[-1], block_b[-1])
+                block_a = block_a[:np.searchsorted(block_a, limit, side='right')]
+                block_b = block_b[:np.searchsorted(block_b, limit, side='right')]
+            block = np.sort(np.concatenate([block_a, block_b]))
+            merged[k:k + len(block)] = block
+            i += len(block_a)
+            j += len(block_b)
+            k += len(block)
+        merged.flush()
+        del merged
+        
+        self.runs = [run for run in self.runs if run is not first and run is not second]
+        os.remove(first[1])
+        os.remove(second[1])
+        self.runs.append([np.load(path, mmap_mode='r'), path, True])
+    
+    def commit(self):
+        """Keep the hashes of the file that was just written"""
+        for run in self.runs:
+            run[2] = True
+        self.memory = self.merge_sorted(self.memory, self.staged)
+        self.staged = np.empty(0, dtype=np.uint64)
+        while len(self.runs) > self.max_runs:
+            self.runs.sort(key=lambda run: len(run[0]))
+            self.merge_runs(self.runs[0], self.runs[1])
+    
+    def rollback(self):
+        """Forget the hashes of a file whose output was discarded"""
+        for run in self.runs:
+            if not run[2]:
+                os.remove(run[1])
+        self.runs = [run for run in self.runs if run[2]]
+        self.staged = np.empty(0, dtype=np.uint64)
+    
+    def close(self):
+        self.runs = []
+        if self.temp_dir is not None:
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+            self.temp_dir = None
+
+def format_duration(seconds):
+    """Format a number of seconds as e.g. 1h 02m, 4m 05s or 12s"""
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+class ConversionScheduler:
+    """Orders a batch and predicts its remaining time from past runs"""
+    
+    # Weight of the newest run in the learned throughput averages
+    smoothing = 0.3
+    
+    def __init__(self, history_path):
+        self.history_path = history_path
+        self.history = {}
+        try:
+            with open(history_path, 'r') as f:
+                self.history = json.load(f)
+        except (OSError, ValueError):
+            pass
+        
+        self.sizes = {}
+        self.pending = []
+        self.batch_start = None
+        self.done_bytes = 0
+        self.current = None
+        self.current_rows = 0
+        self.file_start = None
+    
+    def order(self, file_paths, largest_first=False):
+        """Return the files in the order they should be converted"""
+        for path in file_paths:
+            self.sizes[path] = os.path.getsize(path) if os.path.exists(path) else 0
+        if not largest_first:
+            return list(file_paths)
+        return sorted(file_paths, key=lambda path: self.sizes[path], reverse=True)
+    
+    def start_batch(self, file_paths):
+        self.order(file_paths)
+        self.pending = list(file_paths)
+        self.batch_start = time.monotonic()
+        self.done_bytes = 0
+    
+    def start_file(self, file_path):
+        self.current = file_path
+        self.current_rows = 0
+        self.file_start = time.monotonic()
+    
+    def add_rows(self, rows):
+        self.current_rows += rows
+    
+    def finish_file(self, learn=True):
+        """Mark the current file done and learn its throughput"""
+        size = self.sizes.get(self.current, 0)
+        seconds = time.monotonic() - self.file_start
+        if learn and size > 0 and seconds > 0:
+            for key, value in (('bytes_per_sec', size / seconds),
+                               ('rows_per_sec', self.current_rows / seconds)):
+                previous = self.history.get(key)
+                self.history[key] = value if previous is None else (
+                    self.smoothing * value + (1 - self.smoothing) * previous
+                )
+        
+        self.done_bytes += size
+        self.pending.remove(self.current)
+        self.current = None
+    
+    def get_rows_per_byte(self):
+        if self.history.get('bytes_per_sec'):
+            return self.history.get('rows_per_sec', 0) / self.history['bytes_per_sec']
+        return None
+    
+    def estimate(self):
+        """Predict remaining files, bytes, rows and seconds for the batch"""
+        remaining_bytes = sum(self.sizes[path] for path in self.pending)
+        rows_per_byte = self.get_rows_per_byte()
+        
+        # Progress inside the current file is judged by rows read so far
+        # against the rows its size suggests, since the reader cannot report
+        # a byte position
+        if self.current is not None and rows_per_byte:
+            expected_rows = self.sizes[self.current] * rows_per_byte
+            if expected_rows > 0:
+                fraction = min(self.current_rows / expected_rows, 0.95)
+                remaining_bytes -= self.sizes[self.current] * fraction
+        
+        # Blend the learned rate with this run's observed rate, trusting the
+        # observed one more as the run goes on
+        rate = self.history.get('bytes_per_sec')
+        elapsed = time.monotonic() - self.batch_start if self.batch_start else 0
+        processed_bytes = sum(self.sizes.values()) - remaining_bytes
+        if elapsed > 0 and processed_bytes > 0:
+            observed = processed_bytes / elapsed
+            weight = min(elapsed / 30, 1.0) if rate else 1.0
+            rate = weight * observed + (1 - weight) * (rate or 0)
+        
+        return {
+            'remaining_files': len(self.pending),
+            'remaining_bytes': int(remaining_bytes),
+            'remaining_rows': int(remaining_bytes * rows_per_byte) if rows_per_byte else None,
+            'eta_seconds': remaining_bytes / rate if rate else None
+        }
+    
+    def describe(self):
+        """Summarize the estimate for the status line"""
+        estimate = self.estimate()
+        text = (f"{estimate['remaining_files']} file(s), "
+                f"{estimate['remaining_bytes'] / 1024 ** 2:.1f} MB left")
+        if estimate['remaining_rows'] is not None:
+            text += f" (~{estimate['remaining_rows']:,} rows)"
+        if estimate['eta_seconds'] is None:
+            return text + " | ETA unknown"
+        return text + f" | ETA {format_duration(estimate['eta_seconds'])}"
+    
+    def save(self):
+        try:
+            with open(self.history_path, 'w') as f:
+                json.dump(self.history, f, indent=4)
+        except OSError:
+            pass
+
+class StatisticsWriter:
+    """Profile the chunks passed to a writer and save a sidecar once it closes"""
+    
+    def __init__(self, writer, stats_path, artifact_path):
+        self.writer = writer
+        self.stats_path = stats_path
+        self.artifact_path = artifact_path
+        self.statistics = ColumnStatistics()
+    
+    def write(self, df):
+        self.statistics.update(df)
+        self.writer.write(df)
+    
+    def close(self):
+        self.writer.close()
+        self.statistics.save(self.stats_path, self.artifact_path)
+    
+    def commit(self):
+        self.writer.commit()
+    
+    def abort(self):
+        self.writer.abort()
+        if os.path.exists(self.stats_path):
+            os.remove(self.stats_path)
+
+class FormatOutput:
+    """One format's output for a workbook: dedup and delta filters and writer"""
+    
+    def __init__(self, output_path, writer, delta_index=None, delta_key=None,
+                 dedup_set=None, dedup_keys=None):
+        self.output_path = output_path
+        self.writer = writer
+        self.delta_index = delta_index
+        self.delta_key = [delta_key] if isinstance(delta_key, str) else delta_key
+        self.dedup_set = dedup_set
+        self.dedup_keys = [dedup_keys] if isinstance(dedup_keys, str) else dedup_keys
+    
+    def filter_delta(self, df):
+        """Keep only rows that are new or changed since the previous run"""
+        if self.delta_key:
+            mask = self.delta_index.filter(hash_rows(df, self.delta_key), hash_rows(df))
+        else:
+            mask = self.delta_index.filter(hash_rows(df))
+        return df[mask]
+    
+    def write(self, df):
+        """Apply this format's transforms to a shared processed chunk and write it"""
+        if self.dedup_set is not None:
+            df = df[self.dedup_set.add_new(hash_rows(df, self.dedup_keys))]
+        if self.delta_index is not None:
+            df = self.filter_delta(df)
+        self.writer.write(df)
+    
+    def close(self):
+        self.writer.close()
+    
+    def commit(self):
+        self.writer.commit()
+    
+    def remember_rows(self):
+        """Remember the rows once every output of the file has been committed"""
+        if self.delta_index is not None:
+            self.delta_index.save()
+        if self.dedup_set is not None:
+            self.dedup_set.commit()
+    
+    def abort(self):
+        """Discard the output, also after it was closed, and forget its rows"""
+        self.writer.abort()
+        if self.dedup_set is not None:
+            self.dedup_set.rollback()
+
+class ExcelConverter:
+    """Conversion pipeline shared by the GUI and headless runs"""
+    
+    def __init__(self, config_path='config.json'):
         # Store selected files
         self.selected_files = []
         self.selected_date = datetime.now()
-        self.selected_format = None
-        self.selected_file_name = None
+        self.selected_formats = []
         
         # Load configuration
+        self.config_path = config_path
         self.load_config()
+        self.chunk_rows = self.config.get('chunk_rows', 50000)
+        self.last_progress_time = 0
+        self.dedup_sets = {}
+        self.sqlite_databases = {}
+        self.source_outputs = set()
+        
+        # Create a dictionary to store format mappings
+        self.format_mapping = {format['display_name']: format['file_name'] 
+                             for format in self.config['output_formats']}
+        self.format_configs = {format['display_name']: format
+                               for format in self.config['output_formats']}
+    
+    def load_config(self):
+        """Load configuration from JSON file"""
+        try:
+            with open(self.config_path, 'r') as f:
+                self.config = json.load(f)
+        except Exception as e:
+            self.show_error("Error", f"Failed to load configuration: {str(e)}")
+            self.config = {"output_formats": []}
+    
+    def show_error(self, title, message):
+        print(f"{title}: {message}", file=sys.stderr)
+    
+    def show_progress(self, text, force=False):
+        # Headless runs print at most every few seconds
+        if force or time.monotonic() - self.last_progress_time >= 5:
+            self.last_progress_time = time.monotonic()
+            print(text, flush=True)
+    
+    def clean_text(self, text):
+        """Clean text by removing newlines and page breaks"""
+        if pd.isna(text):
+            return text
+        text = str(text)
+        text = re.sub(r'[\n\r]+', ' ', text)
+        text = re.sub(r'\s+', ' ', text)
+        return text.strip()
+    
+    def format_date(self, value):
+        """Format date to YYYY-MM-DD format"""
+        if pd.isna(value):
+            return value
+        
+        try:
+            if isinstance(value, datetime):
+                return value.strftime('%Y-%m-%d')
+            elif isinstance(value, str):
+                for fmt in ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y', '%m-%d-%Y']:
+                    try:
+                        return datetime.strptime(value, fmt).strftime('%Y-%m-%d')
+                    except ValueError:
+                        continue
+            return value
+        except:
+            return value
+    
+    def process_dataframe(self, df):
+        """Process dataframe to clean text and format dates"""
+        processed_df = df.copy()
+        
+        for column in processed_df.columns:
+            if processed_df[column].dtype == 'datetime64[ns]':
+                processed_df[column] = processed_df[column].apply(self.format_date)
+            else:
+                processed_df[column] = processed_df[column].apply(self.clean_text)
+        
+        return processed_df
+    
+    def get_output_filename(self, original_path, display_name=None, partition=None):
+        """Generate output filename based on configuration, date and partition value"""
+        file_name = self.format_mapping.get(display_name)
+        if not file_name:
+            return os.path.splitext(original_path)[0] + '.csv'
+        if (original_path, display_name) in self.source_outputs:
+            # Named after the source, e.g. sales_report_monday_20261017.csv
+            file_name += '_' + os.path.splitext(os.path.basename(original_path))[0]
+        
+        directory = os.path.dirname(original_path)
+        date_str = self.selected_date.strftime('%Y%m%d')
+        if partition is not None:
+            partition_str = 'null' if pd.isna(partition) else self.get_partition_name(partition)
+            return os.path.join(directory, f"{file_name}_{date_str}_{partition_str}.csv")
+        return os.path.join(directory, f"{file_name}_{date_str}.csv")
+    
+    def get_partition_name(self, partition):
+        """Make a partition value safe for a filename without merging distinct values"""
+        value = str(partition)
+        name = re.sub(r'[^\w.-]+', '_', value)
+        if name != value or name.lower() == 'null':
+            # Values like 'a b' and 'a_b', or 'null' and a real null, would
+            # otherwise share a file, so tag altered names with the raw value
+            name += '_' + hashlib.sha1(value.encode('utf-8')).hexdigest()[:8]
+        return name
+    
+    def get_format_config(self, display_name):
+        """Return the config.json entry of an output format"""
+        return self.format_configs.get(display_name, {})
+    
+    def convert_cell(self, cell):
+        """Convert an openpyxl cell the way pandas.read_excel does"""
+        if cell.value is None:
+            return ""
+        if cell.data_type == TYPE_ERROR:
+            return np.nan
+        if cell.data_type == TYPE_NUMERIC:
+            value = int(cell.value)
+            return value if value == cell.value else float(cell.value)
+        return cell.value
+    
+    def parse_batch(self, header_row, batch, dtype=None):
+        """Parse raw rows with the same TextParser settings as pandas.read_excel"""
+        # Widen the header rather than dropping cells beyond it; the extra
+        # columns get pandas' "Unnamed: N" names
+        width = max([len(header_row)] + [len(row) for row in batch])
+        rows = [row + [""] * (width - len(row)) for row in [header_row] + batch]
+        return TextParser(rows, header=0, skip_blank_lines=False, dtype=dtype).read()
+    
+    def combine_dtypes(self, first, second):
+        """Dtype pandas infers for a column whose chunks have these two dtypes"""
+        if first == second:
+            return first
+        # The parser converts booleans, integers and floats to one numeric type
+        numeric = [pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype)
+                   or pd.api.types.is_float_dtype(dtype) for dtype in (first, second)]
+        if all(numeric):
+            if pd.api.types.is_float_dtype(first) or pd.api.types.is_float_dtype(second):
+                return np.dtype('float64')
+            return np.dtype('int64')
+        return pd.concat([pd.Series([], dtype=first), pd.Series([], dtype=second)]).dtype
+    
+    def iter_excel_chunks(self, file_path, progress=None):
+        """Read the first sheet of a workbook as DataFrames of at most chunk_rows rows
+        
+        progress(rows) is called as rows are read, which happens before the
+        first chunk is yielded.
+        """
+        if os.path.splitext(file_path)[1].lower() not in ('.xlsx', '.xlsm'):
+            # Legacy .xls files have no streaming reader
+            df = pd.read_excel(file_path)
+            if progress is not None:
+                progress(len(df))
+            yield df
+            return
+        
+        # First pass: spill the raw rows to a temporary file and learn the
+        # dtype each column would get if the whole sheet were read at once
+        columns = []
+        dtypes = {}
+        has_na = set()
+        chunk_count = 0
+        spill = tempfile.TemporaryFile()
+        
+        def spill_batch(batch):
+            df = self.parse_batch(header_row, batch)
+            for column in df.columns:
+                if column not in columns:
+                    columns.append(column)
+                    if chunk_count:
+                        # Earlier chunks were narrower and lack this column
+                        has_na.add(column)
+                series = df[column]
+                if series.isna().any():
+                    has_na.add(column)
+                if not series.isna().all():
+                    previous = dtypes.get(column)
+                    dtypes[column] = series.dtype if previous is None else self.combine_dtypes(
+                        previous, series.dtype
+                    )
+            pickle.dump(batch, spill, protocol=pickle.HIGHEST_PROTOCOL)
+        
+        try:
+            workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+            try:
+                sheet = workbook.worksheets[0]
+                sheet.reset_dimensions()
+                header_row = None
+                batch = []
+                blank_rows = 0
+                for cells in sheet.rows:
+                    row = [self.convert_cell(cell) for cell in cells]
+                    while row and row[-1] == "":
+                        row.pop()
+                    
+                    if header_row is None:
+                        header_row = row
+                        continue
+                    
+                    # Blank rows inside the data become all-NaN rows, as in
+                    # pandas.read_excel; trailing blank rows are dropped
+                    if not row:
+                        blank_rows += 1
+                        continue
+                    batch.extend([] for _ in range(blank_rows))
+                    blank_rows = 0
+                    batch.append(row)
+                    
+                    if len(batch) >= self.chunk_rows:
+                        spill_batch(batch)
+                        chunk_count += 1
+                        if progress is not None:
+                            progress(len(batch))
+                        batch = []
+                
+                if header_row is not None and (batch or not chunk_count):
+                    spill_batch(batch)
+                    chunk_count += 1
+                    if progress is not None:
+                        progress(len(batch))
+            finally:
+                workbook.close()
+            
+            if header_row is None:
+                # An empty sheet reads as an empty DataFrame
+                yield pd.DataFrame()
+                return
+            
+            # Integer and boolean columns with missing values anywhere in
+            # the sheet are read as float columns
+            targets = {}
+            for column, dtype in dtypes.items():
+                if column in has_na and (pd.api.types.is_bool_dtype(dtype)
+                                         or pd.api.types.is_integer_dtype(dtype)):
+                    dtype = np.dtype('float64')
+                targets[column] = dtype
+            
+            # Text columns are parsed as they are, because a chunk that only
+            # holds numeric-looking text like '007' would otherwise turn it
+            # into a number that casting to text later cannot undo
+            text_dtypes = {
+                column: object for column, dtype in targets.items()
+                if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype)
+            }
+            
+            # Second pass: parse every chunk again with the whole-sheet columns
+            # and dtypes
+            spill.seek(0)
+            for _ in range(chunk_count):
+                df = self.parse_batch(header_row, pickle.load(spill), dtype=text_dtypes or None)
+                if list(df.columns) != columns:
+                    df = df.reindex(columns=columns)
+                for column, dtype in targets.items():
+                    if df[column].dtype != dtype:
+                        df[column] = df[column].astype(dtype)
+                yield df
+        finally:
+            spill.close()
+    
+    def open_output_writer(self, output_path, display_name):
+        """Create the writer for a format's output
+        
+        With column_stats the writer is wrapped so that every artifact gets its
+        own sidecar, named after what is actually written:
+        <name>_stats.json next to a CSV file, <name>_manifest_stats.json next to
+        the manifest of sharded output, and <database>_<name>_stats.json for the
+        rows a SQLite load added, where <name> is the CSV name without .csv.
+        """
+        format_config = self.get_format_config(display_name)
+        file_name = self.format_mapping[display_name]
+        if format_config.get('sink') == 'sqlite':
+            database_path = format_config.get('sqlite_path') or os.path.join(
+                os.path.dirname(output_path),
+                f"{file_name}.db"
+            )
+            writer = SQLiteOutputWriter(
+                self.get_sqlite_database(database_path),
+                file_name,
+                indexes=format_config.get('sqlite_indexes')
+            )
+            output_name = os.path.splitext(os.path.basename(output_path))[0]
+            artifact_path = database_path
+            stats_path = f"{os.path.splitext(database_path)[0]}_{output_name}_stats.json"
+        else:
+            writer = CSVOutputWriter(
+                output_path,
+                max_rows=format_config.get('shard_max_rows'),
+                max_bytes=format_config.get('shard_max_bytes')
+            )
+            artifact_path = writer.get_manifest_path() if writer.sharded else output_path
+            stats_path = os.path.splitext(artifact_path)[0] + '_stats.json'
+        
+        if format_config.get('column_stats'):
+            return StatisticsWriter(writer, stats_path, artifact_path)
+        return writer
+    
+    def get_sqlite_database(self, database_path):
+        """Return the file's transaction on a database, shared by all its outputs"""
+        # Separate connections to one database would lock each other out
+        key = os.path.normcase(os.path.abspath(database_path))
+        if key not in self.sqlite_databases:
+            self.sqlite_databases[key] = SQLiteDatabase(database_path)
+        return self.sqlite_databases[key]
+    
+    def open_sorted_writer(self, file_path, display_name):
+        """Create a writer that sorts and/or partitions a format's output"""
+        format_config = self.get_format_config(display_name)
+        sort_by = format_config.get('sort_by')
+        sort_by = [sort_by] if isinstance(sort_by, str) else list(sort_by or [])
+        partition_by = format_config.get('partition_by')
+        if partition_by and format_config.get('sink') == 'sqlite':
+            # Every partition lands in the same table, so load them through
+            # one writer, ordered by the partition column
+            sort_by = [partition_by] + sort_by
+            partition_by = None
+        
+        def get_output_path(partition_value):
+            partition = None
+            if partition_by:
+                # A None partition value still gets its own "null" output
+                partition = np.nan if partition_value is None else partition_value
+            return self.get_output_filename(file_path, display_name, partition)
+        
+        return ExternalSortWriter(
+            get_output_path,
+            lambda output_path: self.open_output_writer(output_path, display_name),
+            sort_by=sort_by,
+            partition_by=partition_by,
+            run_rows=format_config.get('sort_run_rows', self.chunk_rows),
+            temp_dir=format_config.get('sort_temp_dir'),
+            listing_path=self.get_partition_listing_path(file_path, display_name) if partition_by else None,
+            remove_output=self.remove_csv_output
+        )
+    
+    def get_partition_listing_path(self, file_path, display_name):
+        """Hidden file listing the partition outputs written for a date"""
+        output_path = self.get_output_filename(file_path, display_name)
+        name = os.path.splitext(os.path.basename(output_path))[0]
+        return os.path.join(os.path.dirname(output_path), f".{name}_partitions.json")
+    
+    def remove_csv_output(self, output_path):
+        """Delete a CSV output with the parts, manifest and sidecars written for it"""
+        base = os.path.splitext(output_path)[0]
+        paths = [output_path, base + '_stats.json', base + '_manifest.json', base + '_manifest_stats.json']
+        paths += glob.glob(f"{glob.escape(base)}_part[0-9][0-9][0-9][0-9].csv")
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def open_delta_index(self, output_path, display_name):
+        """Load the row hash index of a format when delta mode is on"""
+        format_config = self.get_format_config(display_name)
+        if not format_config.get('delta'):
+            return None
+        
+        index_path = format_config.get('delta_index') or os.path.join(
+            os.path.dirname(output_path),
+            f".{self.format_mapping[display_name]}_delta_index.npz"
+        )
+        return RowHashIndex(
+            index_path,
+            self.selected_date.strftime('%Y%m%d'),
+            keyed=bool(format_config.get('delta_key'))
+        )
+    
+    def get_dedup_set(self, display_name):
+        """Return the batch-wide set of row hashes of a format with dedup enabled"""
+        format_config = self.get_format_config(display_name)
+        if not format_config.get('dedup'):
+            return None
+        
+        if display_name not in self.dedup_sets:
+            self.dedup_sets[display_name] = SpillingHashSet(
+                format_config.get('dedup_memory_mb', 64) * 1024 ** 2,
+                spill_dir=format_config.get('dedup_spill_dir')
+            )
+        return self.dedup_sets[display_name]
+    
+    def close_dedup_sets(self):
+        for dedup_set in self.dedup_sets.values():
+            dedup_set.close()
+        self.dedup_sets = {}
+    
+    def open_format_output(self, file_path, display_name):
+        """Set up the writer and per-format transforms for one output"""
+        format_config = self.get_format_config(display_name)
+        output_path = self.get_output_filename(file_path, display_name)
+        if format_config.get('sort_by') or format_config.get('partition_by'):
+            writer = self.open_sorted_writer(file_path, display_name)
+        else:
+            writer = self.open_output_writer(output_path, display_name)
+        return FormatOutput(
+            output_path,
+            writer,
+            delta_index=self.open_delta_index(output_path, display_name),
+            delta_key=format_config.get('delta_key'),
+            dedup_set=self.get_dedup_set(display_name),
+            dedup_keys=format_config.get('dedup_keys')
+        )
+    
+    def convert_file(self, file_path, progress=None):
+        """Read a workbook once and feed each processed chunk to every selected format"""
+        outputs = []
+        self.sqlite_databases = {}
+        try:
+            for display_name in self.selected_formats:
+                outputs.append(self.open_format_output(file_path, display_name))
+            
+            for chunk in self.iter_excel_chunks(file_path, progress):
+                processed_df = self.process_dataframe(chunk)
+                for output in outputs:
+                    output.write(processed_df)
+            
+            # Close every output before committing any of them, and commit
+            # them all before remembering any rows, so a failure discards the
+            # whole file instead of leaving some formats committed
+            for output in outputs:
+                output.close()
+            for output in outputs:
+                output.commit()
+        except Exception:
+            self.abort_outputs(outputs)
+            raise
+        finally:
+            # Also release transactions of outputs that failed to open
+            for database in self.sqlite_databases.values():
+                database.rollback()
+            self.sqlite_databases = {}
+        
+        for output in outputs:
+            output.remember_rows()
+    
+    def abort_outputs(self, outputs):
+        """Discard every output of a file, even if discarding one of them fails"""
+        for output in outputs:
+            try:
+                output.abort()
+            except Exception:
+                pass
+    
+    def create_scheduler(self):
+        """Create the scheduler that learns throughput across runs"""
+        # Kept in the home folder rather than next to config.json, which may
+        # sit in a source checkout
+        history_path = self.config.get('history_path') or os.path.join(
+            os.path.expanduser('~'),
+            '.excel_converter_history.json'
+        )
+        return ConversionScheduler(history_path)
+    
+    def schedule_files(self, scheduler):
+        """Order the selected files, keeping the operator's order by default"""
+        # Files are converted one at a time, so largest first only changes how
+        # early the big files finish; it has to be asked for. Delta and dedup
+        # outputs depend on the files converted before them, so their order
+        # is never changed
+        largest_first = (
+            self.config.get('schedule_order', 'selection') == 'largest_first'
+            and not any(
+                self.get_format_config(name).get('delta') or self.get_format_config(name).get('dedup')
+                for name in self.selected_formats
+            )
+        )
+        return scheduler.order(self.selected_files, largest_first=largest_first)
+    
+    def estimate_batch(self):
+        """Describe the predicted work for the selected files without converting"""
+        scheduler = self.create_scheduler()
+        scheduler.start_batch(self.schedule_files(scheduler))
+        return scheduler.describe()
+    
+    def claims_output(self, display_name):
+        """Whether a format's output must not be shared by two files of a batch"""
+        # Delta and dedup outputs depend on the files converted before them,
+        # so a later file overwriting the same CSV output would lose rows
+        format_config = self.get_format_config(display_name)
+        return format_config.get('sink') != 'sqlite' and bool(
+            format_config.get('delta') or format_config.get('dedup')
+        )
+    
+    def name_outputs_per_source(self, file_paths):
+        """Give each file its own output where dedup formats would share one"""
+        # Files in one folder share {file_name}_{date}.csv. With dedup, each
+        # file after the first only adds rows not seen before, so every file
+        # of such a group writes an output named after itself
+        self.source_outputs = set()
+        for display_name in self.selected_formats:
+            format_config = self.get_format_config(display_name)
+            if not self.claims_output(display_name) or format_config.get('delta'):
+                continue
+            
+            groups = {}
+            for file_path in file_paths:
+                output_path = self.get_output_filename(file_path, display_name)
+                groups.setdefault(os.path.normcase(os.path.abspath(output_path)), []).append(file_path)
+            for group in groups.values():
+                if len(group) > 1:
+                    self.source_outputs.update((file_path, display_name) for file_path in group)
+    
+    def find_output_conflict(self, file_path, claimed_outputs):
+        """Claim a file's outputs, or describe the output another file already claimed"""
+        outputs = {}
+        for display_name in self.selected_formats:
+            if not self.claims_output(display_name):
+                continue
+            output_path = self.get_output_filename(file_path, display_name)
+            key = os.path.normcase(os.path.abspath(output_path))
+            if key in claimed_outputs:
+                return (f"its {display_name} output {os.path.basename(output_path)} would overwrite "
+                        f"the one written for {os.path.basename(claimed_outputs[key])}; "
+                        f"convert these files in separate folders or runs")
+            outputs[key] = file_path
+        
+        claimed_outputs.update(outputs)
+        return None
+    
+    def convert_batch(self):
+        """Convert all selected files, returning the success count and error messages"""
+        success_count = 0
+        error_messages = []
+        
+        scheduler = self.create_scheduler()
+        file_paths = self.schedule_files(scheduler)
+        scheduler.start_batch(file_paths)
+        
+        def progress(rows):
+            scheduler.add_rows(rows)
+            self.show_progress(f"Converting {os.path.basename(file_path)} | {scheduler.describe()}")
+        
+        claimed_outputs = {}
+        self.name_outputs_per_source(file_paths)
+        try:
+            for file_path in file_paths:
+                scheduler.start_file(file_path)
+                conflict = self.find_output_conflict(file_path, claimed_outputs)
+                if conflict:
+                    scheduler.finish_file(learn=False)
+                    error_messages.append(f"Error converting {os.path.basename(file_path)}: {conflict}")
+                    continue
+                
+                self.show_progress(
+                    f"Converting {os.path.basename(file_path)} | {scheduler.describe()}",
+                    force=True
+                )
+                try:
+                    # Read, process and save each configured output chunk by chunk
+                    self.convert_file(file_path, progress)
+                    scheduler.finish_file()
+                    success_count += 1
+                    
+                except Exception as e:
+                    scheduler.finish_file(learn=False)
+                    error_messages.append(f"Error converting {os.path.basename(file_path)}: {str(e)}")
+        finally:
+            # Duplicates are only tracked within one batch
+            self.close_dedup_sets()
+            self.source_outputs = set()
+        
+        scheduler.save()
+        return success_count, error_messages
+
+class ExcelConverterWithConfig(ExcelConverter):
+    def __init__(self, root):
+        self.root = root
+        self.root.title("Excel to CSV Converter with Config")
+        self.root.geometry("900x850")
+        
+        # Store selected files and load configuration
+        super().__init__()
+        
+        # Preview state: cache keyed by (path, mtime, size, sheet) and a queue
+        # the background loader uses to hand results back to the Tk thread
+        self.preview_rows = 100
+        self.preview_cache = {}
+        self.preview_queue = queue.Queue()
+        self.preview_path = None
+        self.preview_pending = 0
+        self.preview_loading = set()
         
         # Configure the main window
         self.root.configure(bg='#f0f0f0')
@@ -49,27 +1562,28 @@ class ExcelConverterWithConfig:
         )
         self.config_frame.pack(fill='x', pady=10)
         
-        # Format Selection
+        # Format Selection (several formats share a single read of each file)
         self.format_label = tk.Label(
             self.config_frame,
-            text="Output Format:",
+            text="Output Formats:",
             font=("Helvetica", 10),
             bg='#f0f0f0'
         )
-        self.format_label.grid(row=0, column=0, padx=5, pady=5, sticky='w')
-        
-        # Create a dictionary to store format mappings
-        self.format_mapping = {format['display_name']: format['file_name'] 
-                             for format in self.config['output_formats']}
+        self.format_label.grid(row=0, column=0, padx=5, pady=5, sticky='nw')
         
-        self.format_combo = ttk.Combobox(
+        self.format_listbox = tk.Listbox(
             self.config_frame,
-            values=list(self.format_mapping.keys()),
-            state='readonly',
-            width=30
+            font=("Helvetica", 10),
+            bg='white',
+            selectmode='multiple',
+            exportselection=False,
+            height=min(len(self.format_mapping), 6) or 1,
+            width=32
         )
-        self.format_combo.grid(row=0, column=1, padx=5, pady=5)
-        self.format_combo.bind('<<ComboboxSelected>>', self.on_format_select)
+        for display_name in self.format_mapping:
+            self.format_listbox.insert(tk.END, display_name)
+        self.format_listbox.grid(row=0, column=1, padx=5, pady=5)
+        self.format_listbox.bind('<<ListboxSelect>>', self.on_format_select)
         
         # Date Selection
         self.date_label = tk.Label(
@@ -133,6 +1647,7 @@ class ExcelConverterWithConfig:
         )
         self.files_listbox.pack(side='left', fill='both', expand=True)
         self.scrollbar.config(command=self.files_listbox.yview)
+        self.files_listbox.bind('<<ListboxSelect>>', self.on_file_select)
         
         # Remove Selected Button
         self.remove_button = tk.Button(
@@ -147,6 +1662,68 @@ class ExcelConverterWithConfig:
         )
         self.remove_button.pack(pady=5)
         
+        # Preview Frame
+        self.preview_frame = tk.LabelFrame(
+            self.main_frame,
+            text="Preview",
+            font=("Helvetica", 10, "bold"),
+            bg='#f0f0f0',
+            padx=10,
+            pady=10
+        )
+        self.preview_frame.pack(fill='both', expand=True, pady=10)
+        
+        # Sheet Selection
+        self.sheet_label = tk.Label(
+            self.preview_frame,
+            text="Sheet:",
+            font=("Helvetica", 10),
+            bg='#f0f0f0'
+        )
+        self.sheet_label.grid(row=0, column=0, padx=5, pady=5, sticky='w')
+        
+        self.sheet_combo = ttk.Combobox(
+            self.preview_frame,
+            state='readonly',
+            width=30
+        )
+        self.sheet_combo.grid(row=0, column=1, padx=5, pady=5, sticky='w')
+        self.sheet_combo.bind('<<ComboboxSelected>>', self.on_sheet_select)
+        
+        # Preview Table with Scrollbars
+        self.preview_table_frame = tk.Frame(self.preview_frame, bg='#f0f0f0')
+        self.preview_table_frame.grid(row=1, column=0, columnspan=2, sticky='nsew')
+        self.preview_frame.grid_rowconfigure(1, weight=1)
+        self.preview_frame.grid_columnconfigure(1, weight=1)
+        
+        self.preview_yscroll = ttk.Scrollbar(self.preview_table_frame, orient='vertical')
+        self.preview_yscroll.pack(side='right', fill='y')
+        self.preview_xscroll = ttk.Scrollbar(self.preview_table_frame, orient='horizontal')
+        self.preview_xscroll.pack(side='bottom', fill='x')
+        
+        self.preview_tree = ttk.Treeview(
+            self.preview_table_frame,
+            show='headings',
+            height=8,
+            yscrollcommand=self.preview_yscroll.set,
+            xscrollcommand=self.preview_xscroll.set
+        )
+        self.preview_tree.pack(side='left', fill='both', expand=True)
+        self.preview_yscroll.config(command=self.preview_tree.yview)
+        self.preview_xscroll.config(command=self.preview_tree.xview)
+        
+        # Inferred Column Types
+        self.dtypes_label = tk.Label(
+            self.preview_frame,
+            text="Select a file to preview",
+            font=("Helvetica", 9),
+            bg='#f0f0f0',
+            justify='left',
+            anchor='w',
+            wraplength=800
+        )
+        self.dtypes_label.grid(row=2, column=0, columnspan=2, padx=5, pady=5, sticky='w')
+        
         # Convert Button
         self.convert_button = tk.Button(
             self.main_frame,
@@ -170,19 +1747,18 @@ class ExcelConverterWithConfig:
         )
         self.status_label.pack(pady=10)
     
-    def load_config(self):
-        """Load configuration from JSON file"""
-        try:
-            with open('config.json', 'r') as f:
-                self.config = json.load(f)
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load configuration: {str(e)}")
-            self.config = {"output_formats": []}
+    def show_error(self, title, message):
+        messagebox.showerror(title, message)
+    
+    def show_progress(self, text, force=False):
+        self.status_label.config(text=text, fg='blue')
+        # Conversion runs on the Tk thread, so redraw the label explicitly
+        self.root.update_idletasks()
     
     def on_format_select(self, event):
         """Handle format selection"""
-        self.selected_format = self.format_combo.get()
-        self.selected_file_name = self.format_mapping[self.selected_format]
+        self.selected_formats = [self.format_listbox.get(index)
+                                 for index in self.format_listbox.curselection()]
         self.update_status()
     
     def on_date_select(self, event):
@@ -190,53 +1766,132 @@ class ExcelConverterWithConfig:
         self.selected_date = self.date_picker.get_date()
         self.update_status()
     
-    def clean_text(self, text):
-        """Clean text by removing newlines and page breaks"""
-        if pd.isna(text):
-            return text
-        text = str(text)
-        text = re.sub(r'[\n\r]+', ' ', text)
-        text = re.sub(r'\s+', ' ', text)
-        return text.strip()
+    def on_file_select(self, event):
+        """Show a preview of the first selected file"""
+        selected_indices = self.files_listbox.curselection()
+        if not selected_indices:
+            return
+        
+        # Always ask again: the cache key notices files changed on disk, and
+        # previews that failed are not cached, so they are retried
+        self.preview_path = self.selected_files[selected_indices[0]]
+        self.request_preview(self.preview_path, None)
     
-    def format_date(self, value):
-        """Format date to YYYY-MM-DD format"""
-        if pd.isna(value):
-            return value
+    def on_sheet_select(self, event):
+        """Show a preview of another sheet of the previewed file"""
+        if self.preview_path:
+            self.request_preview(self.preview_path, self.sheet_combo.get())
+    
+    def get_preview_key(self, file_path, sheet_name):
+        """Build a cache key that is invalidated when the file changes on disk"""
+        stat = os.stat(file_path)
+        return (file_path, stat.st_mtime, stat.st_size, sheet_name)
+    
+    def request_preview(self, file_path, sheet_name):
+        """Show a cached preview or start loading it in the background"""
+        try:
+            key = self.get_preview_key(file_path, sheet_name)
+        except OSError as e:
+            self.show_preview_error(file_path, e)
+            return
         
+        if key in self.preview_cache:
+            self.show_preview(file_path, self.preview_cache[key])
+            return
+        if key in self.preview_loading:
+            # Already being read; the queue poll shows it once it arrives
+            return
+        
+        self.dtypes_label.config(text=f"Loading preview of {os.path.basename(file_path)}...")
+        thread = threading.Thread(
+            target=self.load_preview,
+            args=(file_path, sheet_name, key),
+            daemon=True
+        )
+        thread.start()
+        self.preview_loading.add(key)
+        self.preview_pending += 1
+        if self.preview_pending == 1:
+            self.root.after(50, self.poll_preview_queue)
+    
+    def load_preview(self, file_path, sheet_name, key):
+        """Read the first rows of a sheet (runs in a background thread)"""
         try:
-            if isinstance(value, datetime):
-                return value.strftime('%Y-%m-%d')
-            elif isinstance(value, str):
-                for fmt in ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y', '%m-%d-%Y']:
-                    try:
-                        return datetime.strptime(value, fmt).strftime('%Y-%m-%d')
-                    except ValueError:
-                        continue
-            return value
-        except:
-            return value
+            with pd.ExcelFile(file_path) as excel_file:
+                sheet_names = excel_file.sheet_names
+                if sheet_name not in sheet_names:
+                    sheet_name = sheet_names[0]
+                # nrows stops the reader after the first rows instead of
+                # parsing the whole sheet
+                df = pd.read_excel(excel_file, sheet_name=sheet_name, nrows=self.preview_rows)
+            
+            preview = {
+                'sheet_names': sheet_names,
+                'sheet_name': sheet_name,
+                'dtypes': {str(column): str(dtype) for column, dtype in df.dtypes.items()},
+                'data': self.process_dataframe(df)
+            }
+            self.preview_queue.put((file_path, key, preview, None))
+        except Exception as e:
+            self.preview_queue.put((file_path, key, None, e))
     
-    def process_dataframe(self, df):
-        """Process dataframe to clean text and format dates"""
-        processed_df = df.copy()
-        
-        for column in processed_df.columns:
-            if processed_df[column].dtype == 'datetime64[ns]':
-                processed_df[column] = processed_df[column].apply(self.format_date)
-            else:
-                processed_df[column] = processed_df[column].apply(self.clean_text)
+    def poll_preview_queue(self):
+        """Pick up previews loaded by the background thread"""
+        try:
+            while True:
+                file_path, key, preview, error = self.preview_queue.get_nowait()
+                self.preview_pending -= 1
+                self.preview_loading.discard(key)
+                if error is not None:
+                    if file_path == self.preview_path:
+                        self.show_preview_error(file_path, error)
+                    continue
+                
+                self.preview_cache[key] = preview
+                # Also cache under the resolved sheet name so switching back
+                # to the first sheet does not read the file again
+                self.preview_cache[key[:3] + (preview['sheet_name'],)] = preview
+                if file_path == self.preview_path:
+                    self.show_preview(file_path, preview)
+        except queue.Empty:
+            pass
         
-        return processed_df
+        if self.preview_pending > 0:
+            self.root.after(50, self.poll_preview_queue)
     
-    def get_output_filename(self, original_path):
-        """Generate output filename based on configuration and date"""
-        if not self.selected_file_name:
-            return os.path.splitext(original_path)[0] + '.csv'
+    def show_preview(self, file_path, preview):
+        """Fill the preview table with processed rows"""
+        data = preview['data']
+        columns = [str(column) for column in data.columns]
         
-        directory = os.path.dirname(original_path)
-        date_str = self.selected_date.strftime('%Y%m%d')
-        return os.path.join(directory, f"{self.selected_file_name}_{date_str}.csv")
+        self.sheet_combo.config(values=preview['sheet_names'])
+        self.sheet_combo.set(preview['sheet_name'])
+        
+        self.preview_tree.delete(*self.preview_tree.get_children())
+        self.preview_tree.config(columns=columns)
+        for column in columns:
+            self.preview_tree.heading(column, text=column)
+            self.preview_tree.column(column, width=120, stretch=False)
+        
+        for row in data.itertuples(index=False):
+            self.preview_tree.insert('', tk.END, values=['' if pd.isna(value) else value for value in row])
+        
+        dtypes_text = ", ".join(f"{column}: {dtype}" for column, dtype in preview['dtypes'].items())
+        self.dtypes_label.config(
+            text=f"{os.path.basename(file_path)} | first {len(data)} row(s) | Types: {dtypes_text}"
+        )
+    
+    def show_preview_error(self, file_path, error):
+        """Clear the preview and show why it could not be loaded"""
+        self.clear_preview(f"Cannot preview {os.path.basename(file_path)}: {str(error)}")
+    
+    def clear_preview(self, message):
+        """Empty the preview table and show a message instead"""
+        self.preview_tree.delete(*self.preview_tree.get_children())
+        self.preview_tree.config(columns=[])
+        self.sheet_combo.config(values=[])
+        self.sheet_combo.set('')
+        self.dtypes_label.config(text=message)
     
     def select_files(self):
         file_paths = filedialog.askopenfilenames(
@@ -261,7 +1916,9 @@ class ExcelConverterWithConfig:
         
         for index in reversed(selected_indices):
             self.files_listbox.delete(index)
-            self.selected_files.pop(index)
+            if self.selected_files.pop(index) == self.preview_path:
+                self.preview_path = None
+                self.clear_preview("Select a file to preview")
         
         self.update_status()
         if not self.selected_files:
@@ -269,10 +1926,11 @@ class ExcelConverterWithConfig:
     
     def update_status(self):
         count = len(self.selected_files)
-        format_text = f"Format: {self.selected_format}" if self.selected_format else "No format selected"
+        format_text = f"Formats: {', '.join(self.selected_formats)}" if self.selected_formats else "No format selected"
         date_text = f"Date: {self.selected_date.strftime('%Y-%m-%d')}"
+        estimate_text = f" | {self.estimate_batch()}" if count else ""
         self.status_label.config(
-            text=f"{count} file(s) selected | {format_text} | {date_text}",
+            text=f"{count} file(s) selected | {format_text} | {date_text}{estimate_text}",
             fg='black'
         )
     
@@ -280,32 +1938,12 @@ class ExcelConverterWithConfig:
         if not self.selected_files:
             return
         
-        if not self.selected_format:
+        if not self.selected_formats:
             messagebox.showwarning("Warning", "Please select an output format")
             return
         
-        success_count = 0
-        error_count = 0
-        error_messages = []
-        
-        for file_path in self.selected_files:
-            try:
-                # Read the Excel file
-                df = pd.read_excel(file_path)
-                
-                # Process the dataframe
-                processed_df = self.process_dataframe(df)
-                
-                # Generate output path with configured format and date
-                output_path = self.get_output_filename(file_path)
-                
-                # Save as CSV with UTF-8 encoding
-                processed_df.to_csv(output_path, index=False, encoding='utf-8')
-                success_count += 1
-                
-            except Exception as e:
-                error_count += 1
-                error_messages.append(f"Error converting {os.path.basename(file_path)}: {str(e)}")
+        success_count, error_messages = self.convert_batch()
+        error_count = len(error_messages)
         
         if success_count > 0:
             messagebox.showinfo(
@@ -323,7 +1961,52 @@ class ExcelConverterWithConfig:
             fg='green' if error_count == 0 else 'orange'
         )
 
+def run_headless(args):
+    """Convert files from the command line without opening a window"""
+    converter = ExcelConverter(args.config)
+    # Accept either a format's display name or its file name
+    file_names = {file_name: display_name for display_name, file_name in converter.format_mapping.items()}
+    for format_name in args.formats:
+        display_name = format_name if format_name in converter.format_mapping else file_names.get(format_name)
+        if display_name is None:
+            print(f"Unknown output format: {format_name}", file=sys.stderr)
+            return 2
+        if display_name not in converter.selected_formats:
+            converter.selected_formats.append(display_name)
+    
+    if args.date:
+        converter.selected_date = datetime.strptime(args.date, '%Y-%m-%d')
+    converter.selected_files = list(dict.fromkeys(args.files))
+    
+    if args.estimate:
+        print(converter.estimate_batch())
+        return 0
+    
+    success_count, error_messages = converter.convert_batch()
+    for message in error_messages:
+        print(message, file=sys.stderr)
+    print(f"Conversion complete: {success_count} succeeded, {len(error_messages)} failed")
+    return 1 if error_messages else 0
+
 def main():
+    parser = argparse.ArgumentParser(description="Excel to CSV Converter with Config")
+    parser.add_argument('files', nargs='*', help="Excel files to convert (opens the GUI when omitted)")
+    parser.add_argument('-f', '--format', dest='formats', action='append', default=[],
+                        help="output format display name or file name; repeat for several formats")
+    parser.add_argument('-d', '--date', help="date used in output file names (YYYY-MM-DD, default today)")
+    parser.add_argument('-c', '--config', default='config.json', help="configuration file")
+    parser.add_argument('--estimate', action='store_true',
+                        help="print the predicted remaining work and time, then exit")
+    args = parser.parse_args()
+    
+    if args.files:
+        if not args.formats:
+            parser.error("at least one --format is required")
+        sys.exit(run_headless(args))
+    
+    if DateEntry is None:
+        parser.error("the GUI needs tkcalendar; install it or pass files to convert headless")
+    
     root = tk.Tk()
     app = ExcelConverterWithConfig(root)
     root.mainloop()
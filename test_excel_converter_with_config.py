@@ -0,0 +1,584 @@
+import json
+import os
+import queue
+import sqlite3
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+
+import excel_converter_with_config
+from excel_converter_with_config import (
+    ColumnStatistics, ConversionScheduler, ExcelConverter, ExcelConverterWithConfig, ExternalSortWriter,
+    SQLiteOutputWriter, SpillingHashSet, hash_rows
+)
+
+
+def make_converter(tmp_path, output_formats, selected_formats, **config):
+    config_path = tmp_path / 'config.json'
+    config.setdefault('history_path', str(tmp_path / 'history.json'))
+    config_path.write_text(json.dumps(dict(config, output_formats=output_formats)))
+    converter = ExcelConverter(str(config_path))
+    converter.selected_formats = list(selected_formats)
+    converter.selected_date = datetime(2026, 10, 17)
+    converter.show_progress = lambda text, force=False: None
+    return converter
+
+
+def write_workbook(path, rows):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    for row in rows:
+        sheet.append(list(row))
+    workbook.save(path)
+    return str(path)
+
+
+def whole_sheet_csv(converter, path):
+    """Output of the original read_excel + process_dataframe path"""
+    return converter.process_dataframe(pd.read_excel(path)).to_csv(index=False)
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 2, 3, 50000])
+def test_chunked_read_matches_whole_sheet(tmp_path, chunk_rows):
+    path = write_workbook(tmp_path / 'in.xlsx', [
+        ['id', 'when', 'flag', 'amount', 'note', 'code'],
+        [1, datetime(2026, 1, 1), True, 1, 'a\nb'],
+        [2, datetime(2026, 1, 2), False, 2.5, 'c'],
+        [None, datetime(2026, 1, 3), None, 3, None],
+        [],
+        [4, 'not a date', True, 4, 'd', 'beyond header'],
+        [5, datetime(2026, 1, 5), False, 5, 'e'],
+        [6, datetime(2026, 1, 6), True, 6, 'f'],
+        [7, datetime(2026, 1, 7), 3, 7, 'g'],
+        [],
+        [],
+    ] + [[n, None, None, None, None, text] for n, text in [(8, '007'), (9, '7.50'), (10, 'x')]])
+    converter = make_converter(
+        tmp_path, [{'display_name': 'Daily Report', 'file_name': 'daily'}],
+        ['Daily Report'], chunk_rows=chunk_rows
+    )
+
+    converter.convert_file(path)
+
+    with open(tmp_path / 'daily_20261017.csv') as f:
+        assert f.read() == whole_sheet_csv(converter, path)
+
+
+def test_chunked_read_of_an_empty_sheet_is_empty(tmp_path):
+    path = write_workbook(tmp_path / 'in.xlsx', [])
+    converter = make_converter(
+        tmp_path, [{'display_name': 'Daily Report', 'file_name': 'daily'}], ['Daily Report'], chunk_rows=2
+    )
+
+    converter.convert_file(path)
+
+    assert list(converter.iter_excel_chunks(path))[0].empty
+    with open(tmp_path / 'daily_20261017.csv') as f:
+        assert f.read() == whole_sheet_csv(converter, path)
+
+
+def test_chunked_read_keeps_whole_sheet_dtypes(tmp_path):
+    path = write_workbook(tmp_path / 'in.xlsx', [['id'], [1], [2], [None], [4], [5], [6]])
+    converter = make_converter(tmp_path, [], [], chunk_rows=2)
+
+    chunks = list(converter.iter_excel_chunks(path))
+
+    assert [str(chunk['id'].dtype) for chunk in chunks] == ['float64'] * 3
+    assert pd.concat(chunks, ignore_index=True).equals(pd.read_excel(path))
+
+
+def test_chunked_read_keeps_date_columns_with_gaps(tmp_path):
+    path = write_workbook(tmp_path / 'in.xlsx', [
+        ['due'], [datetime(2026, 1, 1)], [None], [datetime(2026, 1, 3)], [datetime(2026, 1, 4)]
+    ])
+    converter = make_converter(tmp_path, [], [], chunk_rows=1)
+
+    chunks = list(converter.iter_excel_chunks(path))
+
+    assert {chunk['due'].dtype for chunk in chunks} == {pd.read_excel(path)['due'].dtype}
+
+
+def read_rows(path):
+    with open(path) as f:
+        return f.read().splitlines()[1:]
+
+
+@pytest.mark.parametrize('delta_key', [None, 'id'])
+def test_delta_rerun_for_same_date_repeats_the_delta(tmp_path, delta_key):
+    day1 = write_workbook(tmp_path / 'day1.xlsx', [['id', 'name'], [1, 'a'], [2, 'b'], [3, 'c']])
+    day2 = write_workbook(tmp_path / 'day2.xlsx', [['id', 'name'], [1, 'a'], [2, 'b'], [3, 'CHANGED'], [4, 'w']])
+    converter = make_converter(
+        tmp_path, [{'display_name': 'Daily Report', 'file_name': 'daily', 'delta': True, 'delta_key': delta_key}],
+        ['Daily Report']
+    )
+    converter.convert_file(day1)
+    converter.selected_date = datetime(2026, 10, 18)
+
+    converter.convert_file(day2)
+    converter.convert_file(day2)
+
+    assert read_rows(tmp_path / 'daily_20261018.csv') == ['3,CHANGED', '4,w']
+
+
+def test_delta_refuses_dates_before_the_last_run(tmp_path):
+    path = write_workbook(tmp_path / 'in.xlsx', [['id'], [1]])
+    converter = make_converter(
+        tmp_path, [{'display_name': 'Daily Report', 'file_name': 'daily', 'delta': True}], ['Daily Report']
+    )
+    converter.convert_file(path)
+    converter.selected_date = datetime(2026, 10, 16)
+
+    with pytest.raises(ValueError, match='earlier date'):
+        converter.convert_file(path)
+
+
+def test_delta_batch_rejects_files_sharing_an_output(tmp_path):
+    first = write_workbook(tmp_path / 'a.xlsx', [['id'], [1], [2]])
+    second = write_workbook(tmp_path / 'b.xlsx', [['id'], [2], [3]])
+    converter = make_converter(
+        tmp_path, [{'display_name': 'Daily Report', 'file_name': 'daily', 'delta': True}], ['Daily Report']
+    )
+    converter.selected_files = [first, second]
+
+    success_count, error_messages = converter.convert_batch()
+
+    assert success_count == 1
+    assert len(error_messages) == 1 and 'b.xlsx' in error_messages[0]
+    assert read_rows(tmp_path / 'daily_20261017.csv') == ['1', '2']
+
+
+def test_sqlite_rejects_unknown_index_columns(tmp_path):
+    path = write_workbook(tmp_path / 'in.xlsx', [['id', 'name'], [1, 'a']])
+    converter = make_converter(
+        tmp_path,
+        [{'display_name': 'Sales Analysis', 'file_name': 'sales', 'sink': 'sqlite', 'sqlite_indexes': [['nope']]}],
+        ['Sales Analysis']
+    )
+
+    with pytest.raises(ValueError, match='nope'):
+        converter.convert_file(path)
+
+    connection = sqlite3.connect(tmp_path / 'sales.db')
+    assert connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'").fetchall() == []
+    connection.close()
+
+
+def test_column_stats_sidecar_per_written_artifact(tmp_path):
+    path = write_workbook(tmp_path / 'in.xlsx', [['id', 'region'], [1, 'N'], [2, 'S'], [3, 'N']])
+    converter = make_converter(tmp_path, [
+        {'display_name': 'Plain', 'file_name': 'plain', 'column_stats': True},
+        {'display_name': 'Sharded', 'file_name': 'sharded', 'column_stats': True, 'shard_max_rows': 2},
+        {'display_name': 'Partitioned', 'file_name': 'parts', 'column_stats': True, 'partition_by': 'region'},
+        {'display_name': 'Loaded', 'file_name': 'loaded', 'column_stats': True, 'sink': 'sqlite'},
+    ], ['Plain', 'Sharded', 'Partitioned', 'Loaded'])
+
+    converter.convert_file(path)
+
+    sidecars = {name: json.loads((tmp_path / name).read_text()) for name in os.listdir(tmp_path)
+                if name.endswith('_stats.json')}
+    assert {name: (stats['output'], stats['row_count']) for name, stats in sidecars.items()} == {
+        'plain_20261017_stats.json': ('plain_20261017.csv', 3),
+        'sharded_20261017_manifest_stats.json': ('sharded_20261017_manifest.json', 3),
+        'parts_20261017_N_stats.json': ('parts_20261017_N.csv', 2),
+        'parts_20261017_S_stats.json': ('parts_20261017_S.csv', 1),
+        'loaded_loaded_20261017_stats.json': ('loaded.db', 3),
+    }
+
+
+def test_failed_close_discards_every_output_of_the_file(tmp_path, monkeypatch):
+    path = write_workbook(tmp_path / 'in.xlsx', [['id'], [1], [2]])
+    converter = make_converter(tmp_path, [
+        {'display_name': 'Deduped', 'file_name': 'deduped', 'dedup': True},
+        {'display_name': 'Delta', 'file_name': 'delta', 'delta': True},
+        {'display_name': 'Profiled', 'file_name': 'profiled', 'column_stats': True},
+    ], ['Deduped', 'Delta', 'Profiled'])
+
+    def fail_save(self, path, output_path):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(ColumnStatistics, 'save', fail_save)
+
+    with pytest.raises(OSError, match='disk full'):
+        converter.convert_file(path)
+
+    assert sorted(name for name in os.listdir(tmp_path) if name != 'config.json') == ['in.xlsx']
+    dedup_set = converter.dedup_sets['Deduped']
+    assert not dedup_set.contains(hash_rows(pd.DataFrame({'id': [1, 2]}))).any()
+
+
+@pytest.mark.parametrize('schedule_order, format_config, expected', [
+    (None, {}, ['small.xlsx', 'big.xlsx']),
+    ('largest_first', {}, ['big.xlsx', 'small.xlsx']),
+    ('largest_first', {'delta': True}, ['small.xlsx', 'big.xlsx']),
+    ('largest_first', {'dedup': True}, ['small.xlsx', 'big.xlsx']),
+])
+def test_schedule_keeps_selection_order_unless_asked(tmp_path, schedule_order, format_config, expected):
+    small = write_workbook(tmp_path / 'small.xlsx', [['id'], [1]])
+    big = write_workbook(tmp_path / 'big.xlsx', [['id']] + [[n] for n in range(500)])
+    config = {'schedule_order': schedule_order} if schedule_order else {}
+    converter = make_converter(
+        tmp_path, [dict(format_config, display_name='Daily Report', file_name='daily')], ['Daily Report'], **config
+    )
+    converter.selected_files = [small, big]
+
+    order = converter.schedule_files(converter.create_scheduler())
+
+    assert [os.path.basename(path) for path in order] == expected
+
+
+def test_dedup_batch_gives_files_sharing_an_output_their_own(tmp_path):
+    first = write_workbook(tmp_path / 'a.xlsx', [['id', 'name'], [1, 'u'], [2, 'v'], [3, 'w']])
+    second = write_workbook(tmp_path / 'b.xlsx', [['id', 'name'], [3, 'w'], [4, 'w']])
+    other_folder = tmp_path / 'other'
+    other_folder.mkdir()
+    third = write_workbook(other_folder / 'c.xlsx', [['id', 'name'], [4, 'w'], [5, 'x']])
+    converter = make_converter(
+        tmp_path, [{'display_name': 'Daily Report', 'file_name': 'daily', 'dedup': True}], ['Daily Report']
+    )
+    converter.selected_files = [first, second, third]
+
+    assert converter.convert_batch() == (3, [])
+
+    assert read_rows(tmp_path / 'daily_a_20261017.csv') == ['1,u', '2,v', '3,w']
+    assert read_rows(tmp_path / 'daily_b_20261017.csv') == ['4,w']
+    assert read_rows(other_folder / 'daily_20261017.csv') == ['5,x']
+    assert not os.path.exists(tmp_path / 'daily_20261017.csv')
+
+
+def test_partition_names_keep_distinct_values_apart(tmp_path):
+    path = write_workbook(tmp_path / 'in.xlsx', [
+        ['id', 'region'], [1, 'a b'], [2, 'a_b'], [3, 'Null'], [4, None], [5, 'a b']
+    ])
+    converter = make_converter(
+        tmp_path, [{'display_name': 'Daily Report', 'file_name': 'daily', 'partition_by': 'region'}],
+        ['Daily Report']
+    )
+
+    converter.convert_file(path)
+
+    outputs = sorted(name for name in os.listdir(tmp_path) if name.startswith('daily_'))
+    assert len(outputs) == 4 and 'daily_20261017_a_b.csv' in outputs and 'daily_20261017_null.csv' in outputs
+    assert sorted(tuple(read_rows(tmp_path / name)) for name in outputs) == [
+        ('1,a b', '5,a b'), ('2,a_b',), ('3,Null',), ('4,',)
+    ]
+
+
+def test_partition_outputs_of_an_earlier_run_are_removed(tmp_path):
+    path = write_workbook(tmp_path / 'in.xlsx', [['id', 'region'], [1, 'N'], [2, 'S']])
+    converter = make_converter(
+        tmp_path,
+        [{'display_name': 'Daily Report', 'file_name': 'daily', 'partition_by': 'region', 'column_stats': True}],
+        ['Daily Report']
+    )
+    converter.convert_file(path)
+    write_workbook(path, [['id', 'region'], [1, 'N']])
+    (tmp_path / 'daily_20261017_notes.csv').write_text('kept')
+
+    converter.convert_file(path)
+
+    assert sorted(name for name in os.listdir(tmp_path) if name.startswith('daily_')) == [
+        'daily_20261017_N.csv', 'daily_20261017_N_stats.json', 'daily_20261017_notes.csv'
+    ]
+
+
+def test_partition_values_sharing_a_file_are_refused(tmp_path):
+    path = write_workbook(tmp_path / 'in.xlsx', [['id', 'region'], [1, 'N'], [2, 'S']])
+    converter = make_converter(
+        tmp_path, [{'display_name': 'Daily Report', 'file_name': 'daily', 'partition_by': 'region'}],
+        ['Daily Report']
+    )
+    converter.get_partition_name = lambda partition: 'same'
+
+    with pytest.raises(ValueError, match="'N' and 'S'"):
+        converter.convert_file(path)
+
+    assert not any(name.startswith('daily_') for name in os.listdir(tmp_path))
+
+
+def make_previewer(tmp_path):
+    """GUI converter with the preview state but without a Tk window"""
+    (tmp_path / 'config.json').write_text(json.dumps({'output_formats': []}))
+    previewer = ExcelConverterWithConfig.__new__(ExcelConverterWithConfig)
+    ExcelConverter.__init__(previewer, str(tmp_path / 'config.json'))
+    previewer.preview_rows = 2
+    previewer.preview_cache = {}
+    previewer.preview_queue = queue.Queue()
+    previewer.preview_path = None
+    previewer.preview_pending = 0
+    previewer.preview_loading = set()
+    previewer.scheduled = []
+    previewer.root = SimpleNamespace(after=lambda ms, callback: previewer.scheduled.append(callback))
+    previewer.dtypes_label = SimpleNamespace(config=lambda **kwargs: None)
+    previewer.shown = []
+    previewer.show_preview = lambda file_path, preview: previewer.shown.append((file_path, preview))
+    previewer.show_preview_error = lambda file_path, error: previewer.shown.append((file_path, error))
+    return previewer
+
+
+def wait_for_previews(previewer):
+    deadline = time.monotonic() + 10
+    while previewer.preview_queue.qsize() < previewer.preview_pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    previewer.poll_preview_queue()
+
+
+def test_load_preview_reads_the_first_rows_of_a_sheet(tmp_path):
+    path = write_workbook(tmp_path / 'in.xlsx', [['id', 'note'], [1, 'a\nb'], [2, 'c'], [3, 'd']])
+    previewer = make_previewer(tmp_path)
+
+    previewer.load_preview(path, 'no such sheet', 'key')
+    previewer.load_preview(str(tmp_path / 'missing.xlsx'), None, 'other')
+
+    file_path, key, preview, error = previewer.preview_queue.get_nowait()
+    assert (file_path, key, error) == (path, 'key', None)
+    assert preview['sheet_name'] == 'Sheet' and preview['dtypes']['id'] == 'int64'
+    assert preview['data'].to_dict('list') == {'id': ['1', '2'], 'note': ['a b', 'c']}
+    assert isinstance(previewer.preview_queue.get_nowait()[3], OSError)
+
+
+def test_preview_reloads_files_changed_on_disk_and_retries_failures(tmp_path):
+    path = write_workbook(tmp_path / 'in.xlsx', [['id'], [1]])
+    previewer = make_previewer(tmp_path)
+    previewer.selected_files = [path]
+    previewer.files_listbox = SimpleNamespace(curselection=lambda: (0,))
+
+    previewer.on_file_select(None)
+    previewer.on_file_select(None)
+    assert previewer.preview_pending == 1
+    wait_for_previews(previewer)
+    previewer.on_file_select(None)
+    write_workbook(path, [['id'], [2]])
+    os.utime(path, (time.time() + 5, time.time() + 5))
+    previewer.on_file_select(None)
+    wait_for_previews(previewer)
+    os.remove(path)
+    previewer.on_file_select(None)
+
+    assert [preview['data']['id'].tolist() for _, preview in previewer.shown[:3]] == [['1'], ['1'], ['2']]
+    assert isinstance(previewer.shown[3][1], OSError)
+    assert previewer.preview_pending == 0 and not previewer.preview_loading
+
+
+def test_poll_preview_queue_keeps_polling_while_previews_are_pending(tmp_path):
+    previewer = make_previewer(tmp_path)
+    previewer.preview_path = 'b.xlsx'
+    previewer.preview_pending = 3
+    previewer.preview_loading = {'a-key', 'b-key', 'c-key'}
+    preview = {'sheet_name': 'Sheet'}
+    previewer.preview_queue.put(('a.xlsx', ('a.xlsx', 1, 2, None), preview, None))
+    previewer.preview_queue.put(('b.xlsx', 'b-key', None, ValueError('bad file')))
+
+    previewer.poll_preview_queue()
+
+    assert previewer.preview_cache == {('a.xlsx', 1, 2, None): preview, ('a.xlsx', 1, 2, 'Sheet'): preview}
+    assert [(file_path, str(error)) for file_path, error in previewer.shown] == [('b.xlsx', 'bad file')]
+    assert previewer.preview_pending == 1 and previewer.scheduled == [previewer.poll_preview_queue]
+
+
+def test_sqlite_formats_sharing_a_database_load_in_one_transaction(tmp_path):
+    path = write_workbook(tmp_path / 'in.xlsx', [['id'], [1], [2]])
+    database_path = str(tmp_path / 'shared.db')
+    converter = make_converter(tmp_path, [
+        {'display_name': 'Sales', 'file_name': 'sales', 'sink': 'sqlite', 'sqlite_path': database_path},
+        {'display_name': 'Stock', 'file_name': 'stock', 'sink': 'sqlite', 'sqlite_path': database_path},
+    ], ['Sales', 'Stock'], chunk_rows=1)
+
+    converter.convert_file(path)
+
+    connection = sqlite3.connect(database_path)
+    assert [connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in ('sales', 'stock')] == [2, 2]
+    connection.close()
+
+
+def test_failed_close_rolls_back_sqlite_rows(tmp_path, monkeypatch):
+    path = write_workbook(tmp_path / 'in.xlsx', [['id'], [1], [2]])
+    converter = make_converter(tmp_path, [
+        {'display_name': 'Loaded', 'file_name': 'loaded', 'sink': 'sqlite', 'dedup': True},
+        {'display_name': 'Profiled', 'file_name': 'profiled', 'column_stats': True},
+    ], ['Loaded', 'Profiled'])
+
+    def fail_save(self, path, output_path):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(ColumnStatistics, 'save', fail_save)
+
+    with pytest.raises(OSError, match='disk full'):
+        converter.convert_file(path)
+
+    connection = sqlite3.connect(tmp_path / 'loaded.db')
+    assert connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall() == []
+    connection.close()
+    assert not converter.dedup_sets['Loaded'].contains(hash_rows(pd.DataFrame({'id': [1, 2]}))).any()
+
+
+def test_partitions_keep_equal_numbers_written_differently_apart(tmp_path):
+    path = write_workbook(tmp_path / 'in.xlsx', [
+        ['id', 'region'], [1, '7.0'], [2, '7'], [3, '1e0'], [4, '1'], [5, '7'], [6, 'x']
+    ])
+    converter = make_converter(
+        tmp_path, [{'display_name': 'Daily Report', 'file_name': 'p', 'partition_by': 'region'}], ['Daily Report']
+    )
+
+    converter.convert_file(path)
+
+    assert {name: read_rows(tmp_path / name) for name in os.listdir(tmp_path) if name.startswith('p_')} == {
+        'p_20261017_1.csv': ['4,1'],
+        'p_20261017_1e0.csv': ['3,1e0'],
+        'p_20261017_7.csv': ['2,7', '5,7'],
+        'p_20261017_7.0.csv': ['1,7.0'],
+        'p_20261017_x.csv': ['6,x'],
+    }
+
+
+def test_sqlite_partitions_load_through_one_writer(tmp_path, monkeypatch):
+    path = write_workbook(tmp_path / 'in.xlsx', [['id', 'region'], [1, 'W'], [2, 'N'], [3, 'S']])
+    converter = make_converter(
+        tmp_path,
+        [{'display_name': 'Loaded', 'file_name': 'loaded', 'sink': 'sqlite', 'partition_by': 'region'}],
+        ['Loaded']
+    )
+    converter.convert_file(path)
+    writes = []
+    write = SQLiteOutputWriter.write
+
+    def fail_load(self, df):
+        writes.append(df['region'].tolist())
+        if 'S' in df['region'].tolist():
+            raise OSError('disk full')
+        write(self, df)
+
+    monkeypatch.setattr(SQLiteOutputWriter, 'write', fail_load)
+
+    with pytest.raises(OSError, match='disk full'):
+        converter.convert_file(path)
+
+    assert writes == [['N', 'S', 'W']]
+    connection = sqlite3.connect(tmp_path / 'loaded.db')
+    assert connection.execute("SELECT id, region FROM loaded").fetchall() == [('2', 'N'), ('3', 'S'), ('1', 'W')]
+    connection.close()
+
+
+@pytest.mark.parametrize('merge_fan_in', [2, 64])
+def test_sort_merges_runs_spilled_to_disk(tmp_path, monkeypatch, merge_fan_in):
+    values = [(n * 7) % 11 for n in range(11)]
+    path = write_workbook(tmp_path / 'in.xlsx', [['id', 'value']] + [[n, value] for n, value in enumerate(values)])
+    temp_dir = tmp_path / 'sort'
+    temp_dir.mkdir()
+    converter = make_converter(tmp_path, [{
+        'display_name': 'Daily Report', 'file_name': 'daily', 'sort_by': 'value',
+        'sort_run_rows': 2, 'sort_temp_dir': str(temp_dir)
+    }], ['Daily Report'], chunk_rows=1)
+    monkeypatch.setattr(ExternalSortWriter, 'merge_fan_in', merge_fan_in)
+
+    converter.convert_file(path)
+
+    expected = sorted((value, n) for n, value in enumerate(values))
+    assert read_rows(tmp_path / 'daily_20261017.csv') == [f"{n},{value}" for value, n in expected]
+    assert os.listdir(temp_dir) == []
+
+
+def test_spilling_hash_set_spills_merges_and_rolls_back(tmp_path):
+    hash_set = SpillingHashSet(16, spill_dir=str(tmp_path), merge_block=2)
+    rng = np.random.default_rng(0)
+    seen = set()
+    for _ in range(30):
+        hashes = rng.integers(0, 60, size=5).astype(np.uint64)
+        expected = []
+        for value in hashes.tolist():
+            expected.append(value not in seen)
+            seen.add(value)
+        assert hash_set.add_new(hashes).tolist() == expected
+        hash_set.commit()
+        assert len(hash_set.runs) <= hash_set.max_runs
+
+    assert hash_set.run_count > len(hash_set.runs) + hash_set.max_runs
+    assert all(np.all(run[0][:-1] < run[0][1:]) for run in hash_set.runs)
+
+    discarded = np.arange(1000, 1010, dtype=np.uint64)
+    assert hash_set.add_new(discarded).all()
+    hash_set.rollback()
+
+    assert not hash_set.contains(discarded).any()
+    assert hash_set.contains(np.array(sorted(seen), dtype=np.uint64)).all()
+    assert sorted(os.listdir(hash_set.temp_dir)) == sorted(os.path.basename(run[1]) for run in hash_set.runs)
+    hash_set.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_dedup_with_a_tiny_memory_budget(tmp_path):
+    files = []
+    for folder, ids in (('a', [1, 2, 3, 3]), ('b', [3, 4, 5]), ('c', [1, 5, 6])):
+        (tmp_path / folder).mkdir()
+        files.append(write_workbook(tmp_path / folder / 'in.xlsx', [['id']] + [[n] for n in ids]))
+    converter = make_converter(tmp_path, [{
+        'display_name': 'Daily Report', 'file_name': 'daily', 'dedup': True,
+        'dedup_memory_mb': 16 / 1024 ** 2, 'dedup_spill_dir': str(tmp_path)
+    }], ['Daily Report'], chunk_rows=1)
+    converter.selected_files = files
+
+    assert converter.convert_batch() == (3, [])
+
+    assert [read_rows(tmp_path / folder / 'daily_20261017.csv') for folder in 'abc'] == [
+        ['1', '2', '3'], ['4', '5'], ['6']
+    ]
+
+
+def test_progress_counts_rows_while_the_sheet_is_read(tmp_path):
+    path = write_workbook(tmp_path / 'in.xlsx', [['id']] + [[n] for n in range(5)])
+    converter = make_converter(tmp_path, [], [], chunk_rows=2)
+    counted = []
+
+    chunks = converter.iter_excel_chunks(path, counted.append)
+    next(chunks)
+
+    assert counted == [2, 2, 1]
+
+
+def test_scheduler_learns_throughput_and_estimates_the_rest(tmp_path, monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(excel_converter_with_config.time, 'monotonic', lambda: clock[0])
+    paths = []
+    for name, size in (('a.xlsx', 1000), ('b.xlsx', 3000)):
+        (tmp_path / name).write_bytes(b'x' * size)
+        paths.append(str(tmp_path / name))
+    history_path = str(tmp_path / 'history.json')
+    scheduler = ConversionScheduler(history_path)
+    scheduler.start_batch(paths)
+    assert scheduler.estimate() == {
+        'remaining_files': 2, 'remaining_bytes': 4000, 'remaining_rows': None, 'eta_seconds': None
+    }
+
+    scheduler.start_file(paths[0])
+    scheduler.add_rows(500)
+    clock[0] += 2
+    scheduler.finish_file()
+    assert scheduler.history == {'bytes_per_sec': 500.0, 'rows_per_sec': 250.0}
+
+    # Halfway through b.xlsx by rows, so half of its bytes are still to go;
+    # the rate blends the learned 500 B/s with 2 s of observed 1250 B/s
+    scheduler.start_file(paths[1])
+    scheduler.add_rows(750)
+    assert scheduler.estimate() == {
+        'remaining_files': 1, 'remaining_bytes': 1500, 'remaining_rows': 750,
+        'eta_seconds': pytest.approx(1500 / (1250 / 15 + 500 * 14 / 15))
+    }
+    clock[0] += 4
+    scheduler.add_rows(750)
+    scheduler.finish_file()
+    assert scheduler.history == pytest.approx({'bytes_per_sec': 0.3 * 750 + 0.7 * 500,
+                                               'rows_per_sec': 0.3 * 375 + 0.7 * 250})
+    scheduler.save()
+
+    reloaded = ConversionScheduler(history_path)
+    reloaded.start_batch(paths)
+    reloaded.start_file(paths[0])
+    clock[0] += 10
+    reloaded.finish_file(learn=False)
+    assert reloaded.history == scheduler.history
+    assert reloaded.estimate()['remaining_rows'] == int(3000 * scheduler.get_rows_per_byte())
+    assert 'ETA' in reloaded.describe()